@@ -1,20 +1,26 @@
+import asyncio
+import io
 import os
 import json
-import psycopg2
-import requests
+import orjson
+import httpx
 from dotenv import load_dotenv
-from langgraph.graph import StateGraph
+import sqlglot
+from sqlglot import exp
 from langchain_core.messages import HumanMessage
-from pydantic import BaseModel
+from dataclasses import dataclass, replace
 from typing import List, Optional
-from psycopg2.extras import RealDictCursor
+from database.db_connection import get_pool
 import re
+import time
 
 # ✅ Load Environment Variables
 load_dotenv()
 
-# ✅ Define State Schema
-class ChatState(BaseModel):
+# ✅ Define State Schema (plain slots dataclass — no Pydantic validation on
+# every node transition)
+@dataclass(slots=True)
+class ChatState:
     messages: List[HumanMessage]
     user_email: str
     intent: str = "general"
@@ -23,125 +29,284 @@ class ChatState(BaseModel):
     requested_field: Optional[str] = None
     userData: Optional[dict] = None  
 
-# ✅ PostgreSQL Connection
-DB_CONFIG = {
-    "dbname": os.getenv("DB_NAME"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "host": os.getenv("DB_HOST"),
-    "port": os.getenv("DB_PORT", 5432),
-}
-
-# ✅ Load HR Policies
+# ✅ Load HR Policies (orjson — faster parse than the stdlib as the file grows)
 try:
-    with open("policies.json", "r", encoding="utf-8") as file:
-        policies = json.load(file)
+    with open("policies.json", "rb") as file:
+        policies = orjson.loads(file.read())
 except Exception as e:
     print(f"❌ Failed to load policies.json: {e}")
     policies = {}
 
+# ✅ Lowercased policy index built once at import, so matching never
+# re-lowercases the keys on the hot path
+POLICY_INDEX = [(key.lower(), key, value) for key, value in policies.items()]
+
+# ✅ Policy keyword automaton — matches every policy name in one linear pass
+# over the message instead of one substring scan per policy
+_policy_automaton = None
+try:
+    import ahocorasick
+
+    if POLICY_INDEX:
+        _policy_automaton = ahocorasick.Automaton()
+        for _key_lower, _key, _value in POLICY_INDEX:
+            _policy_automaton.add_word(_key_lower, (_key, _value))
+        _policy_automaton.make_automaton()
+except ImportError:
+    print("⚠️ pyahocorasick not installed, falling back to per-policy scan")
+
 # ✅ Ollama Configuration
+# Run Ollama with OLLAMA_NUM_PARALLEL=8 (and OLLAMA_MAX_LOADED_MODELS=1) so
+# concurrently-arriving chats are batched into shared forward passes instead
+# of queueing behind each other.
 OLLAMA_URL = "http://localhost:11434/api/generate"
 OLLAMA_MODEL = "llama3"
 
+# ✅ Persistent async HTTP client — reuses TCP connections to Ollama and keeps
+# hundreds of in-flight LLM calls on one event loop
+CLIENT = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=64),
+    timeout=httpx.Timeout(120.0, connect=3.0),
+)
+
+async def _ollama_generate(prompt, default=""):
+    """Sends a single non-streaming generate call to Ollama and returns the text."""
+    response = await CLIENT.post(OLLAMA_URL, json={
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": False,
+    })
+    return response.json().get("response", default).strip()
+
+async def _ollama_stream(prompt):
+    """Yields response chunks from a streaming Ollama generate call."""
+    async with CLIENT.stream("POST", OLLAMA_URL, json={
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": True,
+    }) as response:
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("response"):
+                yield chunk["response"]
+            if chunk.get("done"):
+                break
+
 # 🔹 1. Classify Intent
-def classify_intent(state: ChatState):
+_INTENT_CACHE_MAX = 4096
+_intent_cache = {}  # normalized message -> raw classifier output
+
+async def _classify_llm(normalized):
+    """LLM classification for a normalized message. Cached, so repeats of the
+    same question ('what is my leave balance?') skip the forward pass."""
+    cached = _intent_cache.get(normalized)
+    if cached is not None:
+        return cached
+
+    raw = await _ollama_generate(f"""
+        Classify this message into one of these categories:
+        - 'user_details' (if the user asks about their name, email, phone number, or address)
+        - 'leave_balance' (if the user asks about their remaining leave balance)
+        - 'attendance' (if the user asks about their attendance records)
+        - 'paid_leave' (if the user asks about their paid leave records)
+        - 'hr_policy' (if the user asks about HR policies)
+        - 'general' (for anything else)
+
+        Reply with ONLY a JSON object: {{"intent": "<category>", "reply": "<text>"}}.
+        If the category is 'general', write your answer to the user as an HR
+        assistant in "reply"; otherwise leave "reply" empty.
+
+        Message: '{normalized}'
+        """, default="general")
+
+    if len(_intent_cache) >= _INTENT_CACHE_MAX:
+        _intent_cache.pop(next(iter(_intent_cache)))  # evict the oldest entry
+    _intent_cache[normalized] = raw
+    return raw
+
+async def classify_intent(state: ChatState):
     messages = state.messages
     message = messages[-1].content if messages else ""
 
     if not message:
-        return state.copy(update={"intent": "general"})
+        return replace(state, intent="general")
 
     try:
-        response = requests.post(OLLAMA_URL, json={
-            "model": OLLAMA_MODEL,
-            "prompt": f"""
-            Classify this message into one of these categories:
-            - 'user_details' (if the user asks about their name, email, phone number, or address)
-            - 'leave_balance' (if the user asks about their remaining leave balance)
-            - 'attendance' (if the user asks about their attendance records)
-            - 'paid_leave' (if the user asks about their paid leave records)
-            - 'hr_policy' (if the user asks about HR policies)
-            - 'general' (for anything else)
-
-            Only return the category name without extra text.
-
-            Message: '{message}'
-            """,
-            "stream": False,
-        })
-        
-        response_json = response.json()
-        intent = response_json.get("response", "general").strip()
-        intent = intent.replace("'", "").replace('"', '')  # Ensure clean output
+        normalized = re.sub(r"\s+", " ", message.lower().strip())
+        raw = await _classify_llm(normalized)
+
+        # 🔹 One structured completion covers classification AND the general-chat
+        # reply, so a general message costs a single forward pass.
+        reply = ""
+        try:
+            parsed = json.loads(re.sub(r"```json|```", "", raw).strip())
+            intent = str(parsed.get("intent", "general")).strip()
+            reply = str(parsed.get("reply", "")).strip()
+        except (json.JSONDecodeError, AttributeError):
+            intent = raw.replace("'", "").replace('"', '')  # Model ignored the JSON format
+
         print(f"✅ Classified intent: {intent}")
-        return state.copy(update={"intent": intent})
+        if intent == "general" and reply:
+            return replace(state, intent=intent, response=reply)
+        return replace(state, intent=intent)
 
     except Exception as e:
         print(f"❌ Error classifying intent: {e}")
-        return state.copy(update={"intent": "general"})
+        return replace(state, intent="general")
 
 # 🔹 2. Fetch Database Schema
-def get_database_schema():
+async def _fetch_database_schema():
     try:
-        with psycopg2.connect(**DB_CONFIG) as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute("""
-                    SELECT 
-                        c.relname AS table_name,
-                        a.attname AS column_name,
-                        t.typname AS data_type
-                    FROM pg_catalog.pg_class c
-                    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
-                    JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
-                    JOIN pg_catalog.pg_type t ON a.atttypid = t.oid
-                    WHERE n.nspname = 'public' 
-                    AND a.attnum > 0 
-                    AND NOT a.attisdropped;
-                """)
-                return cursor.fetchall()
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT
+                    c.relname AS table_name,
+                    a.attname AS column_name,
+                    t.typname AS data_type
+                FROM pg_catalog.pg_class c
+                JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+                JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+                JOIN pg_catalog.pg_type t ON a.atttypid = t.oid
+                WHERE n.nspname = 'public'
+                AND a.attnum > 0
+                AND NOT a.attisdropped;
+            """)
+            return [dict(row) for row in rows]
     except Exception as e:
         print(f"❌ Error fetching schema: {e}")
         return []
 
-def generate_sql_query(state: ChatState):
+# ✅ Schema Cache (the schema changes on deploys, not chat turns)
+SCHEMA_CACHE_TTL = 300  # seconds
+_schema_lock = asyncio.Lock()
+_schema_cache = (0.0, None)  # (timestamp, cached schema dict)
+
+async def get_database_schema():
+    """Returns the cached schema with pre-rendered prompt text and column map,
+    refreshing from Postgres at most once per SCHEMA_CACHE_TTL."""
+    global _schema_cache
+
+    async with _schema_lock:
+        ts, cached = _schema_cache
+        if cached is not None and time.time() - ts < SCHEMA_CACHE_TTL:
+            return cached
+
+        schema_info = await _fetch_database_schema()
+        if not schema_info:
+            # Keep serving a stale copy rather than failing the turn
+            return cached
+
+        # 🔹 Precompute the pieces generate_sql_query needs every turn
+        table_columns = {}
+        for row in schema_info:
+            table_name = row["table_name"]
+            column_name = row["column_name"]
+            if table_name not in table_columns:
+                table_columns[table_name] = set()
+            table_columns[table_name].add(column_name.lower())
+
+        schema_str = "\n".join(
+            [f"Table: {row['table_name']}, Column: {row['column_name']} ({row['data_type']})" for row in schema_info]
+        )
+
+        # 🔹 Static head of the SQL prompt, rendered once per refresh instead
+        # of re-joined on every turn
+        prompt_prefix = (
+            "\n    You are an SQL expert. Based on the following database schema, "
+            "generate an optimized SQL query for PostgreSQL.\n\n"
+            f"    Schema Information:\n    {schema_str}"
+        )
+
+        cached = {
+            "rows": schema_info,
+            "schema_str": schema_str,
+            "table_columns": table_columns,
+            "prompt_prefix": prompt_prefix,
+        }
+        _schema_cache = (time.time(), cached)
+        return cached
+
+# ✅ Intents answerable from the database
+SQL_INTENTS = frozenset({"user_details", "leave_balance", "attendance", "paid_leave"})
+
+# ✅ Hand-written parameterized queries for the common intents — (table, SQL).
+# These skip SQL generation through Ollama entirely; asyncpg prepares them
+# automatically, so Postgres reuses the cached plan. $1 is the requesting
+# user's email.
+PREPARED_QUERIES = {
+    "user_details": ("users", "SELECT * FROM users WHERE email_address = $1;"),
+    "leave_balance": ("leave_balance", "SELECT * FROM leave_balance WHERE email_address = $1;"),
+    "attendance": ("attendance", "SELECT * FROM attendance WHERE email_address = $1;"),
+    "paid_leave": ("paid_leave", "SELECT * FROM paid_leave WHERE email_address = $1;"),
+}
+
+# 🔹 Check if the user is asking for all employees (skip filtering) — one
+# compiled case-insensitive scan instead of lowercasing the message and
+# substring-searching per keyword
+ALL_EMPLOYEES_RE = re.compile(r"\b(all employees|list of employees|everyone)\b", re.IGNORECASE)
+
+def _is_fetching_all_employees(message):
+    return bool(ALL_EMPLOYEES_RE.search(message))
+
+# 🔹 Result-set bounds — keep memory and LLM prompt size independent of table size
+MAX_RESULT_ROWS = 200
+
+async def _run_select(sql_query, args=()):
+    """Runs a SELECT on an asyncpg cursor so Postgres streams rows in batches
+    instead of shipping the whole result eagerly, formats at most
+    MAX_RESULT_ROWS of them and summarizes the rest."""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            rows = []
+            extra = 0
+            async for record in conn.cursor(sql_query, *args, prefetch=500):
+                if len(rows) < MAX_RESULT_ROWS:
+                    rows.append(dict(record))
+                else:
+                    extra += 1  # count without materializing
+
+    response = format_response(rows)
+    if extra:
+        response += f"\n… and {extra} more rows."
+    return response
+
+async def run_prepared(state: ChatState):
+    """Answers a known intent with its hand-written parameterized query —
+    no LLM call and no per-request SQL parsing cost."""
+    _, sql_query = PREPARED_QUERIES[state.intent]
+    print(f"🔹 Running prepared query for intent: {state.intent}")
+
+    try:
+        return replace(state, response=await _run_select(sql_query, (state.user_email,)))
+
+    except Exception as e:
+        print(f"❌ Prepared query failed for {state.intent}: {e}")
+        return replace(state, response="Database query failed.")
+
+async def generate_sql_query(state: ChatState):
     """Generates an SQL query using Llama 3 (via Ollama) with schema awareness,
     ensuring email filtering except when retrieving all employees."""
 
     message = state.messages[-1].content if state.messages else ""
 
-    schema_info = get_database_schema()
-    if not schema_info:
-        return state.copy(update={"response": "Database schema unavailable."})
+    schema = await get_database_schema()
+    if not schema:
+        return replace(state, response="Database schema unavailable.")
 
-    # 🔹 Extract schema details
-    table_columns = {}
-    for row in schema_info:
-        table_name = row["table_name"]
-        column_name = row["column_name"]
-        if table_name not in table_columns:
-            table_columns[table_name] = set()
-        table_columns[table_name].add(column_name.lower())
+    is_fetching_all_employees = _is_fetching_all_employees(message)
 
-    schema_str = "\n".join(
-        [f"Table: {row['table_name']}, Column: {row['column_name']} ({row['data_type']})" for row in schema_info]
-    )
-
-    # 🔹 Check if the user is asking for all employees (skip filtering)
-    all_employees_keywords = ["all employees", "list of employees", "everyone"]
-    is_fetching_all_employees = any(keyword in message.lower() for keyword in all_employees_keywords)
-
-    # 🔹 Construct the SQL prompt
+    # 🔹 Construct the SQL prompt — the schema half comes pre-rendered from
+    # the cache, only the per-turn suffix is interpolated here
     if is_fetching_all_employees:
         filtering_instruction = "- Do NOT filter by email_address. Retrieve all records."
     else:
         filtering_instruction = f"- Ensure the WHERE clause includes email_address = '{state.user_email}'"
 
-    prompt = f"""
-    You are an SQL expert. Based on the following database schema, generate an optimized SQL query for PostgreSQL.
-
-    Schema Information:
-    {schema_str}
+    prompt = f"""{schema["prompt_prefix"]}
 
     User Request:
     {message}
@@ -155,39 +320,70 @@ def generate_sql_query(state: ChatState):
     """
 
     try:
-        response = requests.post(OLLAMA_URL, json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False})
-        sql_query = response.json().get("response", "").strip()
+        sql_query = await _ollama_generate(prompt)
 
         # 🔹 Remove any unexpected text around SQL
         sql_query = re.sub(r"```sql|```", "", sql_query).strip()
         print(f"✅ Generated SQL query: {sql_query}")
 
-        return state.copy(update={"response": sql_query})
+        return replace(state, response=sql_query)
 
     except Exception as e:
         print(f"❌ Error generating SQL: {e}")
-        return state.copy(update={"response": "Failed to generate SQL query."})
+        return replace(state, response="Failed to generate SQL query.")
+
+# 🔹 Guard-rails for LLM-generated SQL
+MAX_SQL_ROWS = 500
+
+def _validate_sql(sql_query, user_email, allow_unfiltered=False):
+    """Parses LLM-generated SQL and rejects anything unsafe before it reaches
+    Postgres: only a single SELECT is allowed, a LIMIT is injected when the
+    model forgot one, and the caller's email filter is verified unless the
+    query is an explicit all-employees request. Returns the SQL to execute."""
+    tree = sqlglot.parse_one(sql_query, read="postgres")
+
+    if not isinstance(tree, exp.Select):
+        raise ValueError("only SELECT statements are allowed")
+
+    if not tree.args.get("limit"):
+        tree = tree.limit(MAX_SQL_ROWS)
+
+    if not allow_unfiltered:
+        for eq in tree.find_all(exp.EQ):
+            column = eq.find(exp.Column)
+            literal = eq.find(exp.Literal)
+            if (column is not None and column.name.lower() == "email_address"
+                    and literal is not None and literal.this == user_email):
+                break
+        else:
+            raise ValueError("missing email_address filter for the requesting user")
+
+    return tree.sql(dialect="postgres")
 
 # 🔹 4. Execute SQL Query
-def execute_sql(state: ChatState):
+async def execute_sql(state: ChatState):
     print("🔹 Executing SQL query...")
     sql_query = state.response
     if not sql_query:
-        return state.copy(update={"response": "No SQL query to execute."})
+        return replace(state, response="No SQL query to execute.")
 
+    message = state.messages[-1].content if state.messages else ""
     try:
-        with psycopg2.connect(**DB_CONFIG) as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute(sql_query)
-                result = cursor.fetchall()
+        sql_query = _validate_sql(sql_query, state.user_email,
+                                  allow_unfiltered=_is_fetching_all_employees(message))
+    except Exception as e:
+        print(f"❌ Rejected generated SQL: {e}")
+        return replace(state, response="Database query failed.")
 
-                print(f"✅ SQL query executed successfully. Result: {result}")
+    try:
+        response = await _run_select(sql_query)
+        print("✅ SQL query executed successfully.")
 
-        return state.copy(update={"response": format_response(result)})
+        return replace(state, response=response)
 
     except Exception as e:
         print(f"❌ Database error: {e}")
-        return state.copy(update={"response": "Database query failed."})
+        return replace(state, response="Database query failed.")
     
 # 🔹 4. Format Response Based on Query Type
 def format_response(data):
@@ -202,65 +398,79 @@ def format_response(data):
             # If only one column is retrieved, format as a list
             if len(keys) == 1:
                 key = keys[0]
-                values = [row[key] for row in data]
-                return f"The {key}s are: {', '.join(map(str, values))}."
+                return f"The {key}s are: {', '.join(str(row[key]) for row in data)}."
 
-            # If multiple columns, format as table-like output
-            table = "\n".join([", ".join([f"{k}: {v}" for k, v in row.items()]) for row in data])
-            return f"Here is the requested data:\n{table}"
+            # If multiple columns, write each row straight into one buffer
+            # instead of building a per-row list of intermediate strings
+            buf = io.StringIO()
+            buf.write("Here is the requested data:")
+            for row in data:
+                buf.write("\n")
+                buf.write(", ".join(f"{k}: {v}" for k, v in row.items()))
+            return buf.getvalue()
 
     return data  # Default case    
 
 # 🔹 5. Get HR Policy
 def get_policy(state: ChatState):
     message = state.messages[-1].content if state.messages else ""
+    message_lower = message.lower()
 
-    for key, value in policies.items():
-        if key.lower() in message.lower():
-            return state.copy(update={"response": value})
+    if _policy_automaton is not None:
+        for _, (key, value) in _policy_automaton.iter(message_lower):
+            return replace(state, response=value)
+    else:
+        for key_lower, key, value in POLICY_INDEX:
+            if key_lower in message_lower:
+                return replace(state, response=value)
 
-    return state.copy(update={"response": "Policy not found."})
+    return replace(state, response="Policy not found.")
 
 # 🔹 6. Generate AI Response
-def generate_response(state: ChatState):
+async def generate_response(state: ChatState):
     message = state.messages[-1].content if state.messages else ""
     user_name = state.name if state.name else "User"
+
+    # 🔹 Skip the extra Ollama pass when the answer is already user-ready:
+    # policy text, a formatted SQL table, or the reply produced during
+    # classification for general chat.
+    if state.intent == "hr_policy" and state.response:
+        return state
+    if state.intent == "general" and state.response:
+        return replace(state, response=state.response.replace("[Your Name]", user_name))
+    if state.response.startswith("Here is the requested data:"):
+        return state
+
     if(state.intent != "general"):
         answer = state.response
 
     try:
         if(state.intent != "general"):
-            response = requests.post(OLLAMA_URL, json={
-                "model": OLLAMA_MODEL,
-                "prompt": f"Respond as an HR assistant.\nUser: {message} answer: {answer}",
-                "stream": False,
-        })
-        else:    
-            response = requests.post(OLLAMA_URL, json={
-                "model": OLLAMA_MODEL,
-                "prompt": f"Respond as an HR assistant.\nUser: {message}",
-                "stream": False,
-            })
-
-        response_data = response.json()
-        ai_response = response_data.get("response", "").strip().replace("[Your Name]", user_name)
-
-        return state.copy(update={"response": ai_response})
+            prompt = f"Respond as an HR assistant.\nUser: {message} answer: {answer}"
+        else:
+            prompt = f"Respond as an HR assistant.\nUser: {message}"
+
+        ai_response = (await _ollama_generate(prompt)).replace("[Your Name]", user_name)
+
+        return replace(state, response=ai_response)
 
     except Exception as e:
         print(f"❌ Error in AI response generation: {e}")
-        return state.copy(update={"response": "I'm sorry, I couldn't process your request."})
-
-# ✅ Define LangGraph Workflow
-graph = StateGraph(ChatState)
-graph.add_node("classify_intent", classify_intent)
-graph.add_node("generate_sql_query", generate_sql_query)
-graph.add_node("execute_sql", execute_sql)
-graph.add_node("get_policy", get_policy)
-graph.add_node("generate_response", generate_response)
-
-def intent_router(state: ChatState):
-    if state.intent in ["user_details", "leave_balance", "attendance", "paid_leave"]:
+        return replace(state, response="I'm sorry, I couldn't process your request.")
+
+# ✅ Hand-Rolled Dispatch — the flow is a straight chain with one branch, so
+# plain function calls replace the LangGraph machinery per hop
+async def intent_router(state: ChatState):
+    if state.intent in SQL_INTENTS:
+        # 🔹 Prefer the hand-written query when its table actually exists and
+        # the user is not asking for unfiltered data; fall back to LLM SQL
+        # generation for anything else
+        message = state.messages[-1].content if state.messages else ""
+        schema = await get_database_schema() or {}
+        table = PREPARED_QUERIES[state.intent][0] if state.intent in PREPARED_QUERIES else None
+        if table in schema.get("table_columns", {}) and not _is_fetching_all_employees(message):
+            print(f"🔹 Route to prepared query for intent: {state.intent}")
+            return "run_prepared"
         print(f"🔹 Route to SQL query generation for intent: {state.intent}")
         return "generate_sql_query"
     elif state.intent == "hr_policy":
@@ -270,19 +480,23 @@ def intent_router(state: ChatState):
         print("🔹 Route to AI response generation")
         return "generate_response"
 
-graph.add_edge("__start__", "classify_intent")
-graph.add_conditional_edges("classify_intent", intent_router)
-graph.add_edge("generate_sql_query", "execute_sql")
-graph.add_edge("execute_sql", "generate_response")
-graph.add_edge("get_policy", "generate_response")
+async def _dispatch(state: ChatState):
+    """Runs classification plus the routed data step. Both the JSON and the
+    streaming entry points share this; only the final wording differs."""
+    state = await classify_intent(state)
 
-# ✅ Compile Workflow
-workflow = graph.compile()
+    route = await intent_router(state)
+    if route == "run_prepared":
+        state = await run_prepared(state)
+    elif route == "generate_sql_query":
+        state = await execute_sql(await generate_sql_query(state))
+    elif route == "get_policy":
+        state = get_policy(state)
 
-print("✅ Workflow Compiled Successfully.")
+    return state
 
 # ✅ Function to Handle Chat Requests
-def chatbot(message, user_email):
+async def chatbot(message, user_email):
     print(f"📝 Debug: Received message = '{message}', user_email = {user_email}")
 
     if not message or not isinstance(message, str) or not user_email:
@@ -290,20 +504,50 @@ def chatbot(message, user_email):
         return {"response": "Invalid input. Please provide a valid message."}
 
     try:
-        # ✅ Invoke workflow
-        result = workflow.invoke(ChatState(messages=[HumanMessage(content=message)], user_email=user_email))
-
-        # ✅ Extract response from dictionary
-        if isinstance(result, dict) and "response" in result:
-            response_text = result["response"]
-            print(f"✅ Final AI Response: {response_text}")
-            return {"response": response_text}
-        else:
-            print(f"❌ Unexpected result format: {result}")
-            return {"response": "An internal error occurred. Please try again."}
+        # ✅ Run the pipeline
+        state = await _dispatch(ChatState(messages=[HumanMessage(content=message)], user_email=user_email))
+        state = await generate_response(state)
+
+        print(f"✅ Final AI Response: {state.response}")
+        return {"response": state.response}
 
     except Exception as e:
         print(f"❌ Critical Error in chatbot function: {e}")
         return {"response": "An internal error occurred. Please try again."}
 
+# ✅ Streaming Variant — yields the final answer as Ollama produces it
+async def chatbot_stream(message, user_email):
+    """Like chatbot(), but yields the final answer in chunks so the client sees
+    the first tokens immediately. Internal steps (classification, SQL
+    generation) stay non-streaming; only the last wording pass streams."""
+    if not message or not isinstance(message, str) or not user_email:
+        print("❌ Error: Invalid input received.")
+        yield "Invalid input. Please provide a valid message."
+        return
+
+    try:
+        state = await _dispatch(ChatState(messages=[HumanMessage(content=message)], user_email=user_email))
+
+        user_name = state.name if state.name else "User"
+
+        # 🔹 Same short-circuits as generate_response: answers that are already
+        # user-ready go out as a single chunk
+        if state.intent == "hr_policy" and state.response:
+            yield state.response
+        elif state.intent == "general" and state.response:
+            yield state.response.replace("[Your Name]", user_name)
+        elif state.response.startswith("Here is the requested data:"):
+            yield state.response
+        else:
+            if state.intent != "general":
+                prompt = f"Respond as an HR assistant.\nUser: {message} answer: {state.response}"
+            else:
+                prompt = f"Respond as an HR assistant.\nUser: {message}"
+            async for chunk in _ollama_stream(prompt):
+                yield chunk.replace("[Your Name]", user_name)
+
+    except Exception as e:
+        print(f"❌ Critical Error in chatbot_stream function: {e}")
+        yield "An internal error occurred. Please try again."
+
 
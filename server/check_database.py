@@ -1,4 +1,5 @@
 import psycopg2
+from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 
@@ -39,7 +40,10 @@ def check_table_schema(table_name):
     try:
         with psycopg2.connect(**DB_CONFIG) as conn:
             with conn.cursor() as cursor:
-                cursor.execute(f"SELECT column_name, data_type FROM information_schema.columns WHERE table_name = '{table_name}';")
+                cursor.execute(
+                    "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = %s;",
+                    (table_name,),
+                )
                 columns = cursor.fetchall()
                 if columns:
                     print(f"✅ Schema for `{table_name}`:", columns)
@@ -53,7 +57,7 @@ def test_query(table_name):
     try:
         with psycopg2.connect(**DB_CONFIG) as conn:
             with conn.cursor() as cursor:
-                cursor.execute(f"SELECT * FROM {table_name} LIMIT 5;")
+                cursor.execute(sql.SQL("SELECT * FROM {} LIMIT 5;").format(sql.Identifier(table_name)))
                 results = cursor.fetchall()
                 print(f"✅ Sample data from `{table_name}`:", results)
     except Exception as e:
@@ -1,13 +1,31 @@
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import asyncio
+import os
 
+import asyncpg
+from dotenv import load_dotenv
+
+# ✅ Load environment variables
+load_dotenv()
+
+# ✅ PostgreSQL Configuration
 DB_CONFIG = {
-    "dbname": "your_db",
-    "user": "your_user",
-    "password": "your_password",
-    "host": "your_host",
-    "port": "your_port",
+    "database": os.getenv("DB_NAME"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT", 5432),
 }
 
-def get_db_connection():
-    return psycopg2.connect(**DB_CONFIG)
+# ✅ Shared asyncpg pool — binary protocol, no per-query handshake. Created
+# lazily on first use so it binds to the serving event loop.
+_pool = None
+_pool_lock = asyncio.Lock()
+
+async def get_pool():
+    """Returns the process-wide asyncpg pool, creating it on first call."""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(min_size=4, max_size=32, **DB_CONFIG)
+    return _pool
@@ -1,6 +1,8 @@
 from dotenv import load_dotenv
+import io
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import re
@@ -21,6 +23,10 @@ DB_CONFIG = {
 OLLAMA_URL = "http://localhost:11434/api/generate"
 OLLAMA_MODEL = "llama3"
 
+# ✅ Persistent HTTP session — reuses TCP connections to Ollama
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=0))
+
 # 🔹 1. Fetch Database Schema Dynamically
 def get_database_schema():
     """Fetches the table and column names from PostgreSQL using pg_catalog."""
@@ -66,6 +72,15 @@ def generate_sql_query(user_prompt):
             table_columns[table_name] = set()
         table_columns[table_name].add(column_name.lower())  # Store as lowercase for matching
 
+    # 🔹 One compiled alternation over all mixed-case columns, so fixing the
+    # casing below is a single pass instead of one regex per column
+    mixed_case = {row['column_name'] for row in schema_info if row['column_name'] != row['column_name'].lower()}
+    canonical = {c.lower(): c for c in mixed_case}
+    mixed_case_pattern = (
+        re.compile(r'\b(' + '|'.join(map(re.escape, mixed_case)) + r')\b', re.IGNORECASE)
+        if mixed_case else None
+    )
+
     # Format schema for Llama 3
     schema_str = "\n".join(
         [f"Table: {row['table_name']}, Column: {row['column_name']} ({row['data_type']})" for row in schema_info]
@@ -88,19 +103,16 @@ def generate_sql_query(user_prompt):
     payload = {"model": OLLAMA_MODEL, "prompt": prompt, "stream": False}
 
     try:
-        response = requests.post(OLLAMA_URL, json=payload)
+        response = SESSION.post(OLLAMA_URL, json=payload, timeout=(3, 120))
         response_data = response.json()
         sql_query = response_data.get("response", "").strip()
 
         # 🔹 Clean up the query
         sql_query = re.sub(r"```sql|```", "", sql_query).strip()
 
-        # 🔹 Ensure column names match (fix case issues)
-        for table, columns in table_columns.items():
-            for col in columns:
-                pattern = rf"\b{col}\b"  # Match exact column name
-                if col.lower() != col:  # If it has uppercase letters
-                    sql_query = re.sub(pattern, f'"{col}"', sql_query, flags=re.IGNORECASE)
+        # 🔹 Ensure column names match (fix case issues) in one pass
+        if mixed_case_pattern:
+            sql_query = mixed_case_pattern.sub(lambda m: f'"{canonical[m.group(0).lower()]}"', sql_query)
 
         print(f"✅ Generated SQL: {sql_query}")
         return sql_query
@@ -139,12 +151,16 @@ def format_response(data):
             # If only one column is retrieved, format as a list
             if len(keys) == 1:
                 key = keys[0]
-                values = [row[key] for row in data]
-                return f"The {key}s are: {', '.join(map(str, values))}."
-
-            # If multiple columns, format as table-like output
-            table = "\n".join([", ".join([f"{k}: {v}" for k, v in row.items()]) for row in data])
-            return f"Here is the requested data:\n{table}"
+                return f"The {key}s are: {', '.join(str(row[key]) for row in data)}."
+
+            # If multiple columns, write each row straight into one buffer
+            # instead of building a per-row list of intermediate strings
+            buf = io.StringIO()
+            buf.write("Here is the requested data:")
+            for row in data:
+                buf.write("\n")
+                buf.write(", ".join(f"{k}: {v}" for k, v in row.items()))
+            return buf.getvalue()
 
     return data  # Default case
 
@@ -0,0 +1,7 @@
+# ✅ Gunicorn configuration — run with: gunicorn -c gunicorn.conf.py server:app
+# Uvicorn workers run the FastAPI app on uvloop, so each process keeps many
+# in-flight Ollama and Postgres calls on one event loop.
+
+bind = "0.0.0.0:5000"
+workers = 4
+worker_class = "uvicorn.workers.UvicornWorker"
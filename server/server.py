@@ -1,22 +1,44 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from chatbot import chatbot
+import json
 
-app = Flask(__name__)
-CORS(app, supports_credentials=True)  # ✅ Allow OPTIONS requests
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from chatbot import chatbot, chatbot_stream
 
-@app.route("/chat", methods=["OPTIONS", "POST"])
-def chat():
-    if request.method == "OPTIONS":
-        return jsonify({"message": "CORS Preflight OK"}), 200  # ✅ Respond to OPTIONS
+app = FastAPI()
+app.add_middleware(
+    CORSMiddleware,
+    allow_origin_regex=".*",
+    allow_credentials=True,  # ✅ Allow OPTIONS requests
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
 
-    data = request.get_json()
+@app.post("/chat")
+async def chat(data: dict):
     if not data or "message" not in data or "user_email" not in data:
-        return jsonify({"error": "Missing 'message' or 'user_email'"}), 400
+        return JSONResponse({"error": "Missing 'message' or 'user_email'"}, status_code=400)
 
     message = data["message"]
     user_email = data["user_email"]
-    return jsonify(chatbot(message, user_email))
+    return await chatbot(message, user_email)
+
+@app.post("/chat/stream")
+async def chat_stream(data: dict):
+    if not data or "message" not in data or "user_email" not in data:
+        return JSONResponse({"error": "Missing 'message' or 'user_email'"}, status_code=400)
+
+    async def event_stream():
+        # ✅ Forward answer chunks as Server-Sent Events for low time-to-first-token
+        async for chunk in chatbot_stream(data["message"], data["user_email"]):
+            yield f"data: {json.dumps({'response': chunk})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
+    # Local fallback only — in production run via:
+    #   uvicorn server:app --host 0.0.0.0 --port 5000 --loop uvloop --workers 4
+    import uvicorn
+
+    uvicorn.run(app, port=5000, loop="uvloop")